@@ -1,11 +1,10 @@
 import re
-import os
 import pathlib
 import logging
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
 from langchain.schema import HumanMessage, SystemMessage
 import pypdf  
+from .llm_backends import get_registry
 
 # This line reads your .env file
 load_dotenv()
@@ -85,13 +84,8 @@ def load_manim_examples():
 
 def generate_video(idea: str | None = None, pdf_path: str | None = None):
     """
-    Generates a Manim script and narration using the Alchemyst AI API.
+    Generates a Manim script and narration using the configured LLM backends.
     """
-    api_key = os.getenv("ALCHEMYST_API_KEY")
-    if not api_key:
-        logging.error("ALCHEMYST_API_KEY not found in environment variables. Please check your .env file.")
-        raise Exception("ALCHEMYST_API_KEY not found in environment variables.")
-
     if not idea and not pdf_path:
         raise ValueError("Either an idea or a pdf_path must be provided.")
     if idea and pdf_path:
@@ -147,27 +141,20 @@ def generate_video(idea: str | None = None, pdf_path: str | None = None):
         HumanMessage(content=final_human_prompt),
     ]
 
-    # api call for alchemyst ai
-    logging.info("Sending request to Alchemyst AI API...")
+    # api call, routed and hedged across the configured backends
+    logging.info("Sending request to LLM backends...")
     try:
-        llm = ChatOpenAI(
-            api_key=api_key,
-            model="alchemyst-ai/alchemyst-c1",
-            base_url="https://platform-backend.getalchemystai.com/api/v1/proxy/default",
-        )
-        response = llm.invoke(messages)
-        content = response.content
-        logging.info("Received response from Alchemyst AI.")
-
+        return get_registry().invoke(messages, parse=parse_response)
     except Exception as e:
-        logging.exception(f"An error occurred while calling the Alchemyst AI API: {e}")
-        raise Exception(f"An error occurred while calling the Alchemyst AI API: {e}")
+        logging.exception(f"An error occurred while calling the LLM backends: {e}")
+        raise Exception(f"An error occurred while calling the LLM backends: {e}")
 
-    if not content:
-        logging.error("The API returned an empty response.")
-        raise Exception("The API returned an empty response.")
 
-    
+def parse_response(content: str):
+    """
+    Splits a model response into Manim code and narration.
+    Raises if the response does not contain usable code.
+    """
     if "### NARRATION:" in content:
         manim_code, narration = content.split("### NARRATION:", 1)
         manim_code = re.sub(r"```python", "", manim_code).replace("```", "").strip()
@@ -203,4 +190,4 @@ def generate_video(idea: str | None = None, pdf_path: str | None = None):
                 manim_code = "\n".join(lines)
                 break
     
-    return {"manim_code": manim_code, "output_file": "output.mp4"}, narration
\ No newline at end of file
+    return {"manim_code": manim_code, "output_file": "output.mp4"}, narration
@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+import httpx
+from langchain_openai import ChatOpenAI
+
+
+DEFAULT_BACKEND = {
+    "name": "alchemyst-c1",
+    "model": "alchemyst-ai/alchemyst-c1",
+    "base_url": "https://platform-backend.getalchemystai.com/api/v1/proxy/default",
+    "api_key_env": "ALCHEMYST_API_KEY",
+}
+
+# Used as the hedge delay until a backend has enough samples for a p95.
+# Overridden by LLM_HEDGE_DELAY / LLM_TIMEOUT, read in from_env after .env is loaded.
+DEFAULT_HEDGE_DELAY = 45.0
+DEFAULT_TIMEOUT = 180.0
+MIN_HEDGE_SAMPLES = 5
+STATS_WINDOW = 50
+FAILURE_COOLDOWN = 60.0
+# A hedge loser is ranked as if it takes at least this multiple of the time it ran.
+CENSORED_PENALTY = 2.0
+
+
+class LLMBackendError(Exception):
+    """Raised when no configured backend produced a usable response."""
+
+
+@dataclass
+class BackendStats:
+    """Rolling latency and error tracking for a single backend."""
+
+    latencies: deque = field(default_factory=lambda: deque(maxlen=STATS_WINDOW))
+    censored: deque = field(default_factory=lambda: deque(maxlen=STATS_WINDOW))
+    outcomes: deque = field(default_factory=lambda: deque(maxlen=STATS_WINDOW))
+    consecutive_failures: int = 0
+    last_failure: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record_success(self, latency: float):
+        with self.lock:
+            self.latencies.append(latency)
+            self.outcomes.append(True)
+            self.consecutive_failures = 0
+            self.censored.clear()
+
+    def record_censored(self, elapsed: float):
+        # A request cancelled after losing a hedge took at least this long.
+        # Only a lower bound, so it is kept out of the p95 and used for ranking.
+        with self.lock:
+            self.censored.append(elapsed)
+
+    def censored_floor(self):
+        with self.lock:
+            return max(self.censored, default=0.0) * CENSORED_PENALTY
+
+    def record_failure(self):
+        with self.lock:
+            self.outcomes.append(False)
+            self.consecutive_failures += 1
+            self.last_failure = time.monotonic()
+
+    def p95(self, min_samples: int = 1):
+        with self.lock:
+            if len(self.latencies) < min_samples:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def error_rate(self):
+        with self.lock:
+            if not self.outcomes:
+                return 0.0
+            return self.outcomes.count(False) / len(self.outcomes)
+
+    def cooling_down(self):
+        with self.lock:
+            return (
+                self.consecutive_failures >= 3
+                and time.monotonic() - self.last_failure < FAILURE_COOLDOWN
+            )
+
+
+@dataclass
+class LLMBackend:
+    """An OpenAI-compatible chat completion endpoint serving one model."""
+
+    name: str
+    model: str
+    base_url: str
+    api_key: str
+    timeout: float = DEFAULT_TIMEOUT
+    stats: BackendStats = field(default_factory=BackendStats, repr=False)
+
+    def hedge_delay(self, default: float = DEFAULT_HEDGE_DELAY):
+        p95 = self.stats.p95(MIN_HEDGE_SAMPLES)
+        delay = default if p95 is None else p95
+        return min(delay, self.timeout)
+
+    def expected_cost(self, default: float = DEFAULT_HEDGE_DELAY):
+        """
+        Routing score: p95 latency (at least the penalised time spent losing
+        recent hedges) inflated by the recent error rate.
+        """
+        p95 = self.stats.p95()
+        latency = max(default if p95 is None else p95, self.stats.censored_floor())
+        return latency / max(1.0 - self.stats.error_rate(), 0.05)
+
+    async def ainvoke(self, messages, temperature=None):
+        kwargs = {}
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+        # A client per call: pooled connections are bound to the event loop,
+        # and each registry call runs on its own loop.
+        async with httpx.AsyncClient(timeout=self.timeout) as http_client:
+            llm = ChatOpenAI(
+                api_key=self.api_key,
+                model=self.model,
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_retries=0,  # the registry falls through to other backends instead
+                http_async_client=http_client,
+                **kwargs,
+            )
+            response = await llm.ainvoke(messages)
+        return response.content
+
+
+class BackendRegistry:
+    """
+    Routes chat completions across several OpenAI-compatible backends,
+    hedging slow requests onto the next-best backend.
+    """
+
+    def __init__(self, backends, max_in_flight: int = 2, hedge_delay: float = DEFAULT_HEDGE_DELAY):
+        if not backends:
+            raise LLMBackendError("No LLM backends are configured.")
+        self.backends = list(backends)
+        self.max_in_flight = max(1, max_in_flight)
+        self.hedge_delay = hedge_delay
+
+    @classmethod
+    def from_env(cls):
+        """
+        Builds the registry from LLM_BACKENDS, a JSON list of objects with
+        name, model, base_url and either api_key or api_key_env (plus an
+        optional timeout). Falls back to the single Alchemyst backend.
+        """
+        raw = os.getenv("LLM_BACKENDS")
+        default_timeout = float(os.getenv("LLM_TIMEOUT", DEFAULT_TIMEOUT))
+        hedge_delay = float(os.getenv("LLM_HEDGE_DELAY", DEFAULT_HEDGE_DELAY))
+        configs = json.loads(raw) if raw else [DEFAULT_BACKEND]
+
+        backends = []
+        for config in configs:
+            api_key = config.get("api_key") or os.getenv(config.get("api_key_env", ""))
+            if not api_key:
+                logging.warning(f"Skipping LLM backend '{config.get('name')}': no API key configured.")
+                continue
+            backends.append(LLMBackend(
+                name=config.get("name", config["model"]),
+                model=config["model"],
+                base_url=config["base_url"],
+                api_key=api_key,
+                timeout=float(config.get("timeout", default_timeout)),
+            ))
+        return cls(
+            backends,
+            max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "2")),
+            hedge_delay=hedge_delay,
+        )
+
+    def ranked(self):
+        """Healthy backends first, then by expected latency."""
+        return sorted(
+            self.backends,
+            key=lambda b: (b.stats.cooling_down(), b.expected_cost(self.hedge_delay)),
+        )
+
+    def invoke(self, messages, parse, temperature=None):
+        """
+        Sends `messages` to the best backend and returns `parse(content)`.
+
+        If the request in flight has not answered within that backend's p95
+        latency, the next backend is fired as well. The first response that
+        parses wins and the remaining requests are cancelled. A backend whose
+        response fails to parse, errors or times out counts as a failure.
+        """
+        return asyncio.run(self._invoke(messages, parse, temperature))
+
+    async def _invoke(self, messages, parse, temperature):
+        queue = self.ranked()
+        pending = {}
+        errors = []
+
+        def launch():
+            backend = queue.pop(0)
+            logging.info(f"Sending request to LLM backend '{backend.name}' ({backend.model})...")
+            task = asyncio.create_task(backend.ainvoke(messages, temperature))
+            pending[task] = (backend, time.monotonic())
+            return backend
+
+        try:
+            last_launched = launch()
+            while pending:
+                can_hedge = queue and len(pending) < self.max_in_flight
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=last_launched.hedge_delay(self.hedge_delay) if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    logging.warning(
+                        f"LLM backend '{last_launched.name}' exceeded its hedge delay; hedging."
+                    )
+                    last_launched = launch()
+                    continue
+
+                for task in done:
+                    backend, started = pending.pop(task)
+                    latency = time.monotonic() - started
+                    try:
+                        content = task.result()
+                        if not content:
+                            raise ValueError("The API returned an empty response.")
+                        result = parse(content)
+                    except Exception as e:
+                        logging.warning(f"LLM backend '{backend.name}' failed: {e}")
+                        backend.stats.record_failure()
+                        errors.append(f"{backend.name}: {e}")
+                        continue
+                    backend.stats.record_success(latency)
+                    logging.info(f"Received response from LLM backend '{backend.name}' in {latency:.1f}s.")
+                    return result
+
+                if not pending and queue:
+                    last_launched = launch()
+        finally:
+            for task, (backend, started) in pending.items():
+                if not task.done():
+                    task.cancel()
+                    backend.stats.record_censored(time.monotonic() - started)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        raise LLMBackendError("All LLM backends failed: " + "; ".join(errors))
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Returns the process-wide registry so latency stats persist across jobs."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = BackendRegistry.from_env()
+        return _registry
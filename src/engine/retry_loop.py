@@ -1,12 +1,15 @@
 
 
-import os
 import re
 import logging
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
 
 
+try:
+    from .llm_backends import get_registry
+except ImportError:
+    from llm_backends import get_registry
+
 try:
     from .alchymist_ai import SYSTEM_PROMPT, base_prompt_instructions 
 except ImportError:
@@ -23,22 +26,8 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 
 def fix_manim_code(faulty_code: str, error_message: str, original_context: str):
     """
-    Attempts to fix faulty Manim code using the Alchemyst AI API.
+    Attempts to fix faulty Manim code using the configured LLM backends.
     """
-    
-    api_key = os.getenv("ALCHEMYST_API_KEY")
-    if not api_key:
-        logging.error("ALCHEMYST_API_KEY not found in environment variables for fallback.")
-        return None, None
-
-    # Initialize Alchemyst AI
-    llm = ChatOpenAI(
-        api_key=api_key,
-        model="alchemyst-ai/alchemyst-c1",
-        base_url="https://platform-backend.getalchemystai.com/api/v1/proxy/default",
-        temperature=0.4,  # Lower temperature for precise code fixing
-    )
-
     # 
     fix_prompt_text = (
         f"The following Manim code, intended to '{original_context}', failed with an error.\n\n"
@@ -58,7 +47,7 @@ def fix_manim_code(faulty_code: str, error_message: str, original_context: str):
     )
 
     
-    logging.info("Attempting to fix Manim code via Alchemyst AI fallback...")
+    logging.info("Attempting to fix Manim code via LLM backend fallback...")
     try:
         # Structure the messages for the API call
         messages = [
@@ -66,15 +55,19 @@ def fix_manim_code(faulty_code: str, error_message: str, original_context: str):
             {"role": "user", "content": fix_prompt_text}
         ]
         
-        response = llm.invoke(messages)
-        content = response.content
-        logging.info("Received response from fallback attempt.")
+        # Lower temperature for precise code fixing
+        return get_registry().invoke(messages, parse=parse_fix_response, temperature=0.4)
 
     except Exception as e:
-        logging.exception(f"Error calling Alchemyst AI API during fallback: {e}")
+        logging.exception(f"Error calling LLM backends during fallback: {e}")
         return None, None
 
-    
+
+def parse_fix_response(content: str):
+    """
+    Splits a fallback response into fixed Manim code and narration.
+    Raises if the response does not contain a code block.
+    """
     if "### NARRATION:" in content:
         manim_code, narration = content.split("### NARRATION:", 1)
         manim_code = re.sub(r"```python", "", manim_code).replace("```", "").strip()
@@ -93,7 +86,7 @@ def fix_manim_code(faulty_code: str, error_message: str, original_context: str):
         else:
             logging.error("Fallback extraction failed: No Python code block found in response.")
             logging.debug(f"Fallback content without code block:\n{content}")
-            return None, None
+            raise ValueError("The fallback response does not contain a valid Python code block.")
 
     # Ensure necessary imports are present
     if "from manim import *" not in manim_code:
@@ -1,11 +1,13 @@
 import streamlit as st
 import os
+import uuid
 import subprocess
 import logging
 
 from engine.alchymist_ai import generate_video
 from engine.retry_loop import fix_manim_code
 from services.video_creation import create_manim_video
+from services.render_governor import RenderKilledError, get_governor
 from services.elevenlabs_service import generate_audio
 
 
@@ -48,7 +50,9 @@ def main():
 
     # logic 
     if submitted:
-        # Reset state for new generation
+        # Reset state for new generation, dropping this session's previous video
+        if st.session_state.video_path and os.path.exists(st.session_state.video_path):
+            os.remove(st.session_state.video_path)
         st.session_state.video_path = None
         st.session_state.script = None
         st.session_state.manim_code = None
@@ -63,6 +67,8 @@ def main():
         current_audio_file = None
         final_video = None
         max_retries = 1
+        # Per-job names so concurrent sessions never share (or delete) each other's files
+        job_id = uuid.uuid4().hex[:8]
 
         try:
             # code gen 
@@ -76,7 +82,7 @@ def main():
             with st.spinner("🎙️ Step 2/4: Generating narration..."):
                 try:
                     # Use a unique name to avoid caching issues between runs
-                    audio_file = generate_audio(script, f"initial_audio_{hash(script)}.mp3")
+                    audio_file = generate_audio(script, f"initial_audio_{job_id}.mp3")
                 except Exception as e:
                     st.warning(f"Could not generate audio: {e}. Proceeding without audio.")
                     audio_file = None
@@ -85,6 +91,18 @@ def main():
             current_script = script
             current_audio_file = audio_file
 
+            # Live queue position while waiting for a render slot, cleared on admission
+            queue_status = st.empty()
+
+            def show_queue_position(position):
+                if not position:
+                    queue_status.empty()
+                    return
+                queue_status.info(
+                    f"⏳ Render servers are busy ({get_governor().status()['active']} renders running). "
+                    f"Your video is #{position} in the queue..."
+                )
+
             # video gen with retery loop 
             for attempt in range(max_retries + 1):
                 try:
@@ -94,15 +112,21 @@ def main():
                         final_video = create_manim_video(
                             {"manim_code": current_manim_code, "output_file": "output.mp4"},
                             current_manim_code,
-                            audio_file=current_audio_file
+                            audio_file=current_audio_file,
+                            on_queued=show_queue_position
                         )
                     logging.info("Manim video creation successful.")
                     break  # Exit the loop on success
 
                 except subprocess.CalledProcessError as e:
                     logging.error(f"Manim execution failed on attempt {attempt + 1}.")
-                    stderr_output = e.stderr.decode() if e.stderr else 'No stderr captured.'
-                    st.warning(f"Attempt {attempt + 1} failed. Manim error detected.")
+                    stderr_output = e.stderr.decode(errors="replace") if e.stderr else 'No stderr captured.'
+                    if isinstance(e, RenderKilledError):
+                        st.warning(f"Attempt {attempt + 1} failed. Render was stopped: {e.reason}.")
+                        kills = get_governor().status()["kills"]
+                        st.caption("Renders stopped so far: " + ", ".join(f"{kind} × {count}" for kind, count in kills.items()))
+                    else:
+                        st.warning(f"Attempt {attempt + 1} failed. Manim error detected.")
 
                     if attempt < max_retries:
                         st.info("🤖 Step 4/4: AI is attempting to fix the code...")
@@ -122,7 +146,7 @@ def main():
                                 current_script = fixed_script
                                 try:
                                     # Use a unique name for the fixed audio file
-                                    current_audio_file = generate_audio(current_script, f"fixed_audio_{attempt}.mp3")
+                                    current_audio_file = generate_audio(current_script, f"fixed_audio_{job_id}_{attempt}.mp3")
                                 except Exception as audio_err:
                                     st.warning(f"Could not regenerate audio: {audio_err}. Retrying with previous audio.")
                         else:
@@ -166,7 +190,7 @@ def main():
 
     # showing output 
     # This section reads from st.session_state 
-    if st.session_state.video_path:
+    if st.session_state.video_path and os.path.exists(st.session_state.video_path):
         st.success("🎉 Video generated successfully!")
         st.video(st.session_state.video_path)
 
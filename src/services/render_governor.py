@@ -0,0 +1,277 @@
+import os
+import ast
+import shutil
+import signal
+import logging
+import threading
+import subprocess
+from collections import Counter, deque
+from contextlib import contextmanager
+
+
+# Wall-clock budget: base + per second of estimated scene duration, capped.
+RENDER_TIMEOUT_BASE = float(os.getenv("RENDER_TIMEOUT_BASE", "60"))
+RENDER_TIMEOUT_PER_SECOND = float(os.getenv("RENDER_TIMEOUT_PER_SECOND", "20"))
+RENDER_TIMEOUT_MAX = float(os.getenv("RENDER_TIMEOUT_MAX", "1800"))
+FFMPEG_TIMEOUT_BASE = float(os.getenv("FFMPEG_TIMEOUT_BASE", "30"))
+FFMPEG_TIMEOUT_PER_SECOND = float(os.getenv("FFMPEG_TIMEOUT_PER_SECOND", "4"))
+FFPROBE_TIMEOUT = 30.0
+# Only the end of stderr is kept on failure; it is fed back into the fix prompt.
+STDERR_TAIL_BYTES = 8000
+
+RENDER_MEMORY_LIMIT_MB = int(os.getenv("RENDER_MEMORY_LIMIT_MB", "4096"))
+RENDER_NICENESS = int(os.getenv("RENDER_NICENESS", "10"))
+RENDER_CORES_PER_JOB = int(os.getenv("RENDER_CORES_PER_JOB", "2"))
+
+# Floor for the estimate, so scenes timed only through helpers still get some budget.
+MIN_SCENE_DURATION = 5.0
+# Used when the generated code doesn't parse; scenes are asked to run this long.
+TARGET_SCENE_DURATION = 30.0
+
+
+class RenderKilledError(subprocess.CalledProcessError):
+    """
+    A governed subprocess was killed for exceeding its budget. Subclasses
+    CalledProcessError so existing retry handling picks it up; `reason`
+    says which limit was hit and is prefixed onto stderr for the fix prompt.
+    """
+
+    def __init__(self, kind, reason, returncode, cmd, output=None, stderr=None):
+        self.kind = kind
+        self.reason = reason
+        message = f"Render killed: {reason}.\n".encode()
+        super().__init__(returncode, cmd, output, message + (stderr or b""))
+
+
+def _literal_number(node, default):
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return float(node.value)
+    return default
+
+
+def _iterations(loop):
+    """Trip count of a `for` over range(...) or a literal sequence, else 1."""
+    iterable = loop.iter
+    if isinstance(iterable, (ast.List, ast.Tuple)):
+        return len(iterable.elts)
+    if isinstance(iterable, ast.Call) and getattr(iterable.func, "id", None) == "range":
+        bounds = [_literal_number(arg, None) for arg in iterable.args]
+        if bounds and None not in bounds:
+            try:
+                return len(range(*(int(b) for b in bounds)))
+            except (ValueError, OverflowError, TypeError):
+                # e.g. range(0, 10, 0); the estimator must never fail a render
+                return 1
+    return 1
+
+
+def _statement_duration(node):
+    if isinstance(node, ast.For):
+        body = sum(_statement_duration(child) for child in node.body)
+        return _iterations(node) * body + sum(_statement_duration(child) for child in node.orelse)
+
+    duration = 0.0
+    for child in ast.iter_child_nodes(node):
+        duration += _statement_duration(child)
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+        owner = node.func.value
+        if isinstance(owner, ast.Name) and owner.id == "self":
+            keywords = {kw.arg: kw.value for kw in node.keywords}
+            if node.func.attr == "play":
+                duration += _literal_number(keywords.get("run_time"), 1.0)
+            elif node.func.attr == "wait":
+                value = node.args[0] if node.args else keywords.get("duration")
+                duration += _literal_number(value, 1.0)
+    return duration
+
+
+def estimate_scene_duration(manim_code: str) -> float:
+    """
+    Rough scene length from explicit run_time/wait values, multiplied through
+    `for` loops with a known trip count. Plays without a literal run_time
+    count as Manim's 1s default.
+    """
+    try:
+        tree = ast.parse(manim_code)
+    except SyntaxError:
+        return TARGET_SCENE_DURATION
+    return max(_statement_duration(tree), MIN_SCENE_DURATION)
+
+
+def render_timeout(manim_code: str) -> float:
+    duration = estimate_scene_duration(manim_code)
+    return min(RENDER_TIMEOUT_BASE + RENDER_TIMEOUT_PER_SECOND * duration, RENDER_TIMEOUT_MAX)
+
+
+def ffmpeg_timeout(media_duration: float) -> float:
+    return FFMPEG_TIMEOUT_BASE + FFMPEG_TIMEOUT_PER_SECOND * media_duration
+
+
+def _default_slots():
+    cores = os.cpu_count() or 1
+    slots = cores // max(RENDER_CORES_PER_JOB, 1)
+    try:
+        total_mb = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+        slots = min(slots, total_mb // RENDER_MEMORY_LIMIT_MB)
+    except (ValueError, OSError, AttributeError):
+        pass
+    configured = os.getenv("RENDER_MAX_CONCURRENT", "").strip()
+    return max(int(configured) if configured else slots, 1)
+
+
+def _limited_command(command, cpu_seconds):
+    """
+    Prefixes `command` with nice and prlimit so the limits are applied by
+    exec'd tools rather than Python code in the forked child.
+    """
+    if os.name != "posix":
+        return list(command)
+    prefix = []
+    if shutil.which("nice"):
+        prefix += ["nice", "-n", str(RENDER_NICENESS)]
+    if shutil.which("prlimit"):
+        memory = RENDER_MEMORY_LIMIT_MB * 1024 * 1024
+        cpu = int(cpu_seconds)
+        prefix += ["prlimit", f"--as={memory}", f"--cpu={cpu}:{cpu + 5}", "--"]
+    else:
+        logging.warning("prlimit not found; running without memory and CPU limits.")
+    return prefix + list(command)
+
+
+def _kill_reason(returncode, stderr, timeout, timed_out):
+    """Returns (kind, reason) if a governor limit ended the process, else None."""
+    if timed_out:
+        return "timeout", f"wall-clock timeout after {timeout:.0f}s (scene too long or looping forever)"
+    text = (stderr or b"").decode(errors="replace")
+    if "MemoryError" in text or "Cannot allocate memory" in text or "bad_alloc" in text:
+        return "memory", f"memory limit of {RENDER_MEMORY_LIMIT_MB} MB exceeded"
+    if returncode == -getattr(signal, "SIGXCPU", 0):
+        return "cpu", "CPU time limit exceeded"
+    if returncode == -getattr(signal, "SIGKILL", 0):
+        return "killed", "killed by SIGKILL (CPU or memory limit)"
+    return None
+
+
+class RenderGovernor:
+    """
+    Admission control plus resource limits for render and ffmpeg
+    subprocesses. At most `slots` jobs run at once; the rest wait in FIFO
+    order.
+    """
+
+    def __init__(self, slots: int | None = None):
+        self.slots = slots or _default_slots()
+        self.active = 0
+        self.kills = Counter()
+        self._waiting = deque()
+        self._cond = threading.Condition()
+        logging.info(f"Render governor allows {self.slots} concurrent render(s).")
+
+    def status(self):
+        with self._cond:
+            return {
+                "active": self.active,
+                "queued": len(self._waiting),
+                "slots": self.slots,
+                "kills": dict(self.kills),
+            }
+
+    @contextmanager
+    def admit(self, on_queued=None):
+        """
+        Holds a render slot for the duration of the block. While the job
+        waits, `on_queued(position)` is called with its 1-based queue position
+        every time that position changes, and with 0 once it is admitted.
+        """
+        ticket = object()
+        with self._cond:
+            self._waiting.append(ticket)
+        admitted = False
+        try:
+            reported = None
+            while True:
+                with self._cond:
+                    if self.active < self.slots and self._waiting[0] is ticket:
+                        self._waiting.popleft()
+                        self.active += 1
+                        admitted = True
+                        # Everyone behind us just moved up a place
+                        self._cond.notify_all()
+                        break
+                    position = self._waiting.index(ticket) + 1
+                    if position == reported:
+                        self._cond.wait()
+                        continue
+                # Report outside the lock; the callback may be slow or raise
+                logging.info(f"Render queued at position {position} ({self.slots} slot(s) busy).")
+                if on_queued:
+                    on_queued(position)
+                reported = position
+            if reported is not None and on_queued:
+                on_queued(0)
+        except BaseException:
+            # A dead ticket at the head of the queue, or a slot taken by a job
+            # that never runs, would block every later job
+            with self._cond:
+                if admitted:
+                    self.active -= 1
+                elif ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                self._cond.notify_all()
+            raise
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._cond.notify_all()
+
+    def run(self, command, timeout: float, capture_output: bool = False):
+        """
+        Runs `command` niced, under RLIMIT_AS/RLIMIT_CPU, and kills its whole
+        process group after `timeout` seconds. Stderr is always captured;
+        stdout only when `capture_output` is set. Raises RenderKilledError
+        when a limit was hit and CalledProcessError on any other failure.
+        """
+        logging.info(f"Running governed command (timeout {timeout:.0f}s): {' '.join(command)}")
+        process = subprocess.Popen(
+            _limited_command(command, timeout * RENDER_CORES_PER_JOB),
+            stdout=subprocess.PIPE if capture_output else None,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+        )
+        timed_out = False
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            if os.name == "posix":
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+            stdout, stderr = process.communicate()
+
+        if timed_out or process.returncode != 0:
+            stderr = (stderr or b"")[-STDERR_TAIL_BYTES:]
+            killed = _kill_reason(process.returncode, stderr, timeout, timed_out)
+            if killed:
+                kind, reason = killed
+                with self._cond:
+                    self.kills[kind] += 1
+                logging.error(f"Governed command killed: {reason}")
+                raise RenderKilledError(kind, reason, process.returncode, command, stdout, stderr)
+            raise subprocess.CalledProcessError(process.returncode, command, stdout, stderr)
+        return stdout
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_governor():
+    """Returns the process-wide governor shared by every render job."""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = RenderGovernor()
+        return _governor
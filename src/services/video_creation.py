@@ -1,18 +1,56 @@
 import re
-import subprocess
+import time
+import uuid
+import shutil
+import tempfile
 import os
 import glob
 import logging
 
+from services.render_governor import get_governor, render_timeout, ffmpeg_timeout, FFPROBE_TIMEOUT
+
+# Finished videos live here; everything else stays in a per-job temp directory
+OUTPUT_DIR = "outputs"
+# Videos older than this are pruned, covering sessions that were closed or abandoned
+DEFAULT_OUTPUT_MAX_AGE_HOURS = 24.0
+
 def get_scene_name(manim_code):
     match = re.search(r'class\s+(\w+)\s*\(\s*Scene\s*\)', manim_code)
     if match:
         return match.group(1)
     raise ValueError("No Scene class found in generated code")
 
-def create_manim_video(video_data, manim_code, audio_file=None):
+def prune_outputs(max_age_hours=None):
+    if max_age_hours is None:
+        max_age_hours = float(os.getenv("OUTPUT_MAX_AGE_HOURS", DEFAULT_OUTPUT_MAX_AGE_HOURS))
+    if not os.path.isdir(OUTPUT_DIR):
+        return
+    cutoff = time.time() - max_age_hours * 3600
+    for entry in os.scandir(OUTPUT_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                logging.info(f"Pruned old output {entry.path}")
+        except OSError as e:
+            logging.warning(f"Could not prune {entry.path}: {e}")
+
+def create_manim_video(video_data, manim_code, audio_file=None, on_queued=None):
+    # Waits for a render slot; on_queued(position) is called while the job queues
+    # and with 0 once it is admitted
+    governor = get_governor()
+    with governor.admit(on_queued=on_queued):
+        prune_outputs()
+        work_dir = tempfile.mkdtemp(prefix="alcheanimyst_render_")
+        try:
+            return _create_manim_video(governor, manim_code, audio_file, work_dir)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            logging.info(f"Removed render directory {work_dir}")
+
+def _create_manim_video(governor, manim_code, audio_file, work_dir):
     logging.info("Starting to create Manim video")
-    with open("generated_video.py", "w") as f:
+    script_file = os.path.join(work_dir, "generated_video.py")
+    with open(script_file, "w") as f:
         manim_code_clean = re.sub(r"```python", "", manim_code)
         manim_code_clean = manim_code_clean.replace("```", "").strip()
         f.write(manim_code_clean)
@@ -20,17 +58,19 @@ def create_manim_video(video_data, manim_code, audio_file=None):
     scene_name = get_scene_name(manim_code_clean)
     logging.info(f"Identified scene name: {scene_name}")
     
-    command = ["manim", "-qh", "generated_video.py", scene_name]
+    media_dir = os.path.join(work_dir, "media")
+    command = ["manim", "-qh", "--media_dir", media_dir, script_file, scene_name]
     logging.info(f"Running Manim with command: {' '.join(command)}")
-    subprocess.run(command, check=True)
+    governor.run(command, timeout=render_timeout(manim_code_clean))
     
-    search_pattern = os.path.join("media", "videos", "generated_video", "1080p60", f"{scene_name}.mp4")
+    search_pattern = os.path.join(media_dir, "videos", "generated_video", "1080p60", f"{scene_name}.mp4")
     if not os.path.exists(search_pattern):
         logging.error(f"No rendered video found at: {search_pattern}")
         raise Exception(f"No rendered video found for scene {scene_name}")
     
     output_video = search_pattern
-    final_output = "final_output.mp4"
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    final_output = os.path.join(OUTPUT_DIR, f"final_output_{uuid.uuid4().hex[:8]}.mp4")
 
     if audio_file and os.path.exists(audio_file):
         logging.info(f"Merging video with audio file: {audio_file}")
@@ -40,14 +80,14 @@ def create_manim_video(video_data, manim_code, audio_file=None):
         audio_duration_cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", 
                              "-of", "default=noprint_wrappers=1:nokey=1", audio_file]
         
-        video_duration = float(subprocess.check_output(video_duration_cmd).decode('utf-8').strip())
-        audio_duration = float(subprocess.check_output(audio_duration_cmd).decode('utf-8').strip())
+        video_duration = float(governor.run(video_duration_cmd, timeout=FFPROBE_TIMEOUT, capture_output=True).decode('utf-8').strip())
+        audio_duration = float(governor.run(audio_duration_cmd, timeout=FFPROBE_TIMEOUT, capture_output=True).decode('utf-8').strip())
         
         logging.info(f"Video duration: {video_duration}s, Audio duration: {audio_duration}s")
         
         if audio_duration > video_duration:
             logging.info("Audio is longer than video, extending video duration")
-            extended_video = "extended_video.mp4"
+            extended_video = os.path.join(work_dir, "extended_video.mp4")
             padding_time = audio_duration - video_duration
             
             extend_cmd = [
@@ -62,7 +102,7 @@ def create_manim_video(video_data, manim_code, audio_file=None):
             ]
             
             logging.info(f"Extending video with command: {' '.join(extend_cmd)}")
-            subprocess.run(extend_cmd, check=True)
+            governor.run(extend_cmd, timeout=ffmpeg_timeout(audio_duration))
             output_video = extended_video
         
         merge_cmd = [
@@ -77,16 +117,18 @@ def create_manim_video(video_data, manim_code, audio_file=None):
         ]
         
         logging.info(f"Merging with command: {' '.join(merge_cmd)}")
-        subprocess.run(merge_cmd, check=True)
+        try:
+            governor.run(merge_cmd, timeout=ffmpeg_timeout(max(video_duration, audio_duration)))
+        except BaseException:
+            if os.path.exists(final_output):
+                os.remove(final_output)
+                logging.info(f"Removed partial output {final_output}")
+            raise
+        output_video = final_output
+    else:
+        # The render directory is removed once we return, so keep the video
+        shutil.move(output_video, final_output)
         output_video = final_output
-        
-        if os.path.exists("extended_video.mp4"):
-            os.remove("extended_video.mp4")
-            logging.info("Removed temporary extended video file")
-
-    if os.path.exists("generated_video.py"):
-        os.remove("generated_video.py")
-        logging.info("Removed generated_video.py")
 
     logging.info(f"Final video created at: {output_video}")
     return output_video
@@ -0,0 +1,5 @@
+import sys
+import pathlib
+
+# The app runs from src/ (streamlit run src/main.py), so tests import from there too.
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
@@ -0,0 +1,160 @@
+import json
+import time
+import socket
+import select
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from engine.llm_backends import BackendRegistry, LLMBackend, LLMBackendError
+
+
+class StubServer:
+    """OpenAI-compatible chat completion stub with keep-alive connections."""
+
+    def __init__(self, delay=0.0, content="ok"):
+        self.delay = delay
+        self.content = content
+        self.requests = 0
+        self.cancelled = threading.Event()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.requests += 1
+                # Sleep for the delay, but notice if the client hangs up first.
+                readable, _, _ = select.select([self.connection], [], [], stub.delay)
+                if readable and not self.connection.recv(1, socket.MSG_PEEK):
+                    stub.cancelled.set()
+                    self.close_connection = True
+                    return
+                body = json.dumps({
+                    "id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": stub.content}}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}/v1"
+
+    def backend(self, name):
+        return LLMBackend(name=name, model="stub", base_url=self.base_url, api_key="stub", timeout=10)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stubs():
+    servers = []
+
+    def make(**kwargs):
+        server = StubServer(**kwargs)
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.close()
+
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+
+
+def identity(content):
+    return content
+
+
+def test_fast_backend_wins_and_loser_is_cancelled(stubs):
+    slow, fast = stubs(delay=5, content="slow"), stubs(delay=0.05, content="fast")
+    slow_backend, fast_backend = slow.backend("slow"), fast.backend("fast")
+    registry = BackendRegistry([slow_backend, fast_backend], hedge_delay=0.2)
+
+    started = time.monotonic()
+    assert registry.invoke(MESSAGES, parse=identity) == "fast"
+    assert time.monotonic() - started < 2
+    assert slow.cancelled.wait(2)
+
+    # The loser's time is only a lower bound: it must not enter the p95 ...
+    assert slow_backend.stats.p95() is None
+    assert len(slow_backend.stats.censored) == 1
+    # ... but it should still rank the loser behind the winner next time.
+    assert registry.ranked()[0] is fast_backend
+
+
+def test_parse_failure_falls_through_to_next_backend(stubs):
+    bad, good = stubs(content="garbage"), stubs(content="valid")
+    bad_backend, good_backend = bad.backend("bad"), good.backend("good")
+    registry = BackendRegistry([bad_backend, good_backend], hedge_delay=5)
+
+    def parse(content):
+        if content != "valid":
+            raise ValueError("no code block")
+        return content
+
+    assert registry.invoke(MESSAGES, parse=parse) == "valid"
+    assert bad_backend.stats.error_rate() == 1.0
+    assert good_backend.stats.error_rate() == 0.0
+
+
+def test_all_backends_failing_raises(stubs):
+    registry = BackendRegistry([stubs(content="garbage").backend("only")], hedge_delay=5)
+
+    def parse(content):
+        raise ValueError("no code block")
+
+    with pytest.raises(LLMBackendError):
+        registry.invoke(MESSAGES, parse=parse)
+
+
+def test_cooling_down_backend_is_ranked_last(stubs):
+    flaky, steady = stubs().backend("flaky"), stubs().backend("steady")
+    for _ in range(3):
+        flaky.stats.record_failure()
+    registry = BackendRegistry([flaky, steady])
+
+    assert flaky.stats.cooling_down()
+    assert registry.ranked() == [steady, flaky]
+
+
+def test_consecutive_calls_succeed_over_keep_alive_connections(stubs):
+    server = stubs(content="ok")
+    backend = server.backend("only")
+    registry = BackendRegistry([backend], hedge_delay=5)
+
+    for _ in range(3):
+        assert registry.invoke(MESSAGES, parse=identity) == "ok"
+    assert server.requests == 3
+    assert backend.stats.error_rate() == 0.0
+
+
+def test_from_env_reads_settings_at_call_time(monkeypatch):
+    monkeypatch.setenv("LLM_BACKENDS", json.dumps([
+        {"name": "a", "model": "stub", "base_url": "http://127.0.0.1:1/v1", "api_key": "stub"},
+        {"name": "b", "model": "stub", "base_url": "http://127.0.0.1:1/v1", "api_key": "stub", "timeout": 7},
+    ]))
+    monkeypatch.setenv("LLM_TIMEOUT", "12")
+    monkeypatch.setenv("LLM_HEDGE_DELAY", "3")
+    registry = BackendRegistry.from_env()
+
+    assert [b.timeout for b in registry.backends] == [12.0, 7.0]
+    assert registry.hedge_delay == 3.0
@@ -0,0 +1,195 @@
+import sys
+import time
+import subprocess
+import threading
+
+import pytest
+
+from services import render_governor
+from services.render_governor import (
+    RenderGovernor,
+    RenderKilledError,
+    estimate_scene_duration,
+    MIN_SCENE_DURATION,
+)
+
+
+def test_estimate_sums_run_times_and_waits():
+    code = """
+class Demo(Scene):
+    def construct(self):
+        self.play(Create(c), run_time=4)
+        self.wait(2)
+        self.play(FadeOut(c))
+        self.wait()
+"""
+    assert estimate_scene_duration(code) == 8.0
+
+
+def test_estimate_multiplies_through_for_loops():
+    code = """
+class Demo(Scene):
+    def construct(self):
+        for i in range(100):
+            self.play(c.animate.shift(UP), run_time=2)
+        for item in [a, b, c]:
+            self.wait(1.5)
+"""
+    assert estimate_scene_duration(code) == 204.5
+
+
+def test_estimate_has_a_floor_and_survives_bad_code():
+    assert estimate_scene_duration("class Demo(Scene):\n    pass\n") == MIN_SCENE_DURATION
+    assert estimate_scene_duration("class Demo(Scene:") == render_governor.TARGET_SCENE_DURATION
+    # range() itself would raise on a zero step; count the body once instead
+    assert estimate_scene_duration("for i in range(0, 10, 0):\n    self.wait(6)\n") == 6.0
+
+
+def test_empty_max_concurrent_is_treated_as_unset(monkeypatch):
+    monkeypatch.setenv("RENDER_MAX_CONCURRENT", "")
+    assert render_governor._default_slots() >= 1
+    monkeypatch.setenv("RENDER_MAX_CONCURRENT", "3")
+    assert render_governor._default_slots() == 3
+
+
+def test_admit_is_first_in_first_out():
+    governor = RenderGovernor(slots=1)
+    order = []
+    queued = threading.Event()
+
+    def job(name):
+        with governor.admit(on_queued=lambda position: queued.set()):
+            order.append(name)
+
+    with governor.admit():
+        threads = []
+        for name in ("first", "second", "third"):
+            queued.clear()
+            thread = threading.Thread(target=job, args=(name,))
+            thread.start()
+            threads.append(thread)
+            assert queued.wait(2)
+        assert governor.status()["queued"] == 3
+    for thread in threads:
+        thread.join(2)
+
+    assert order == ["first", "second", "third"]
+    assert governor.status()["active"] == 0
+
+
+def test_admit_drops_ticket_when_on_queued_raises():
+    governor = RenderGovernor(slots=1)
+
+    def abort(position):
+        raise RuntimeError("script stopped")
+
+    with governor.admit():
+        with pytest.raises(RuntimeError):
+            with governor.admit(on_queued=abort):
+                pass
+        assert governor.status()["queued"] == 0
+
+    admitted = threading.Event()
+
+    def job():
+        with governor.admit():
+            admitted.set()
+
+    threading.Thread(target=job, daemon=True).start()
+    assert admitted.wait(2)
+
+
+def test_admit_reports_position_changes_and_admission():
+    governor = RenderGovernor(slots=1)
+    reports = []
+    second_queued = threading.Event()
+    first_release = threading.Event()
+    done = threading.Event()
+
+    def first():
+        with governor.admit(on_queued=lambda position: None):
+            first_release.wait(2)
+
+    def second():
+        def report(position):
+            reports.append(position)
+            if position == 2:
+                second_queued.set()
+
+        with governor.admit(on_queued=report):
+            done.set()
+
+    with governor.admit():
+        threading.Thread(target=first, daemon=True).start()
+        while governor.status()["queued"] < 1:
+            time.sleep(0.01)
+        threading.Thread(target=second, daemon=True).start()
+        assert second_queued.wait(2)
+    # first is admitted, so second moves up to the head of the queue
+    while reports[-1] != 1:
+        time.sleep(0.01)
+    first_release.set()
+
+    assert done.wait(2)
+    assert reports == [2, 1, 0]
+
+
+def test_admit_releases_slot_when_admission_report_raises():
+    governor = RenderGovernor(slots=1)
+
+    def fail_on_admission(position):
+        if position == 0:
+            raise RuntimeError("script stopped")
+
+    blocker = governor.admit()
+    blocker.__enter__()
+    errors = []
+
+    def job():
+        try:
+            with governor.admit(on_queued=fail_on_admission):
+                pass
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=job, daemon=True)
+    thread.start()
+    while governor.status()["queued"] < 1:
+        time.sleep(0.01)
+    blocker.__exit__(None, None, None)
+    thread.join(2)
+
+    assert errors
+    assert governor.status()["active"] == 0
+
+
+def test_run_kills_on_wall_clock_timeout():
+    governor = RenderGovernor(slots=1)
+    started = time.monotonic()
+    with pytest.raises(RenderKilledError) as excinfo:
+        governor.run([sys.executable, "-c", "while True: pass"], timeout=1)
+
+    assert time.monotonic() - started < 5
+    assert excinfo.value.kind == "timeout"
+    assert excinfo.value.stderr.startswith(b"Render killed: wall-clock timeout")
+    assert governor.status()["kills"] == {"timeout": 1}
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="memory limit relies on prlimit")
+def test_run_kills_on_memory_limit(monkeypatch):
+    monkeypatch.setattr(render_governor, "RENDER_MEMORY_LIMIT_MB", 512)
+    governor = RenderGovernor(slots=1)
+    with pytest.raises(RenderKilledError) as excinfo:
+        governor.run([sys.executable, "-c", "x = bytearray(1024 ** 3)"], timeout=30)
+
+    assert excinfo.value.kind == "memory"
+
+
+def test_run_returns_stdout_and_raises_on_plain_failure():
+    governor = RenderGovernor(slots=1)
+    assert governor.run([sys.executable, "-c", "print('hi')"], timeout=10, capture_output=True) == b"hi\n"
+
+    with pytest.raises(subprocess.CalledProcessError) as excinfo:
+        governor.run([sys.executable, "-c", "import sys; sys.exit(3)"], timeout=10)
+    assert not isinstance(excinfo.value, RenderKilledError)
+    assert excinfo.value.returncode == 3
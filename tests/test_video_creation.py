@@ -0,0 +1,24 @@
+import os
+import time
+
+from services import video_creation
+
+
+def test_prune_outputs_removes_only_old_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(video_creation, "OUTPUT_DIR", str(tmp_path))
+    old = tmp_path / "final_output_old.mp4"
+    new = tmp_path / "final_output_new.mp4"
+    old.write_bytes(b"")
+    new.write_bytes(b"")
+    two_days_ago = time.time() - 48 * 3600
+    os.utime(old, (two_days_ago, two_days_ago))
+
+    video_creation.prune_outputs(max_age_hours=24)
+
+    assert not old.exists()
+    assert new.exists()
+
+
+def test_prune_outputs_tolerates_missing_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(video_creation, "OUTPUT_DIR", str(tmp_path / "missing"))
+    video_creation.prune_outputs(max_age_hours=24)